@@ -1,23 +1,72 @@
 import os
 import asyncio
+import collections
+import contextlib
+import logging
+import logging.handlers
+import queue
+import sys
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from google import genai
+from starlette.websockets import WebSocketState
+from websockets.exceptions import ConnectionClosedOK
+
+# Backports for Python < 3.11
+if sys.version_info < (3, 11, 0):
+    import taskgroup, exceptiongroup
+
+    asyncio.TaskGroup = taskgroup.TaskGroup
+    ExceptionGroup = exceptiongroup.ExceptionGroup
 
 # Environment / Config
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise ValueError("Missing GOOGLE_API_KEY environment variable.")
 
+# Logging: records are queued on the event loop and written to stderr by a
+# listener thread, so hot-path log calls never block on stdio.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler(), respect_handler_level=True
+)
+logger = logging.getLogger("ws")
+logger.setLevel(LOG_LEVEL)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def start_logging():
+    _log_listener.start()
+
+@app.on_event("shutdown")
+async def stop_logging():
+    _log_listener.stop()
+
+@app.on_event("startup")
+async def load_index():
+    # Read index.html once so GET / never touches the disk on the event loop
+    with open("index.html", "rb") as f:
+        app.state.index_html = f.read()
+    # Fixed Content-Length so the page goes out in a single write;
+    # no-cache keeps browsers revalidating during development.
+    app.state.index_response = HTMLResponse(
+        content=app.state.index_html,
+        headers={
+            "content-length": str(len(app.state.index_html)),
+            "cache-control": "no-cache",
+        },
+    )
+
 @app.get("/")
 async def get_index():
-    with open("index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(f.read())
+    return app.state.index_response
 
 # Gemini Config
 MODEL = "models/gemini-2.0-flash-exp"
@@ -45,74 +94,382 @@ client = genai.Client(
 SEND_SAMPLE_RATE = 16000    # Browser -> Server -> Gemini
 RECEIVE_SAMPLE_RATE = 24000 # Gemini -> Server -> Browser
 
+# Outbound audio backlog allowed before the oldest frames are dropped (~10 s of
+# 24 kHz 16-bit PCM). Gemini sends faster than real time, so this is a byte
+# budget for a stalled browser, not a frame count.
+OUT_QUEUE_MAX_BYTES = RECEIVE_SAMPLE_RATE * 2 * 10
+# Small PCM chunks are coalesced into one WebSocket frame until either
+# threshold is hit, amortizing per-frame and per-syscall overhead.
+COALESCE_BUFFER_SIZE = 65536  # bytes
+COALESCE_FLUSH_BYTES = 16384  # bytes
+COALESCE_FLUSH_DELAY = 0.02   # seconds
+
+# Pre-warmed Gemini sessions, so a new browser connection skips the live API handshake
+# (per process; SESSION_POOL_SIZE=0 disables the pool)
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+SESSION_POOL_TTL = 300         # seconds an idle session is kept before reconnecting
+SESSION_POOL_RETRY_DELAY = 5   # seconds to wait after a failed warm-up
+
+class _PooledSession:
+    """An open Gemini session waiting in the pool; whoever claims it closes it."""
+
+    def __init__(self, session, stack):
+        self.session = session
+        self.stack = stack
+        self.claimed = asyncio.Event()
+
+async def _keep_session_warm():
+    """Keeps one idle session in the pool, replacing it when claimed or expired."""
+    pool = app.state.session_pool
+    while True:
+        stack = contextlib.AsyncExitStack()
+        try:
+            session = await stack.enter_async_context(
+                client.aio.live.connect(model=MODEL, config=CONFIG)
+            )
+        except Exception as e:
+            await stack.aclose()
+            logger.warning("[Server] Failed to pre-warm Gemini session: %s", e)
+            await asyncio.sleep(SESSION_POOL_RETRY_DELAY)
+            continue
+
+        pooled = _PooledSession(session, stack)
+        pool.append(pooled)
+        try:
+            await asyncio.wait_for(pooled.claimed.wait(), SESSION_POOL_TTL)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if not pooled.claimed.is_set():
+                # Idle too long (or shutting down): close it and warm a fresh one
+                pool.remove(pooled)
+                await stack.aclose()
+
+def _take_pooled_session():
+    """Returns an idle pooled session, or None if there is none ready."""
+    pool = app.state.session_pool
+    if not pool:
+        return None
+    pooled = pool.popleft()
+    pooled.claimed.set()
+    return pooled
+
+def _session_is_open(session):
+    """Best-effort check that a session's websocket hasn't been closed yet."""
+    ws = getattr(session, "_ws", None)
+    if ws is None:
+        return True
+    closed = getattr(ws, "closed", None)
+    if isinstance(closed, bool):
+        return not closed
+    state = getattr(ws, "state", None)
+    return getattr(state, "name", None) not in ("CLOSING", "CLOSED")
+
+class _FallbackSession:
+    """
+    Wraps a pooled session. If a send/receive fails before the first response
+    has arrived (e.g. the server dropped it while idle), reconnects inline and
+    retries once. Only a received response proves the session is live: a send
+    on a half-open socket is merely buffered and succeeds.
+    """
+
+    def __init__(self, pooled):
+        self._session = pooled.session
+        self._stack = pooled.stack
+        self._lock = asyncio.Lock()
+        self._verified = False
+
+    async def _replace(self, failed, error):
+        async with self._lock:
+            # Another loop may have already replaced it
+            if self._session is failed:
+                logger.warning("[Server] Pooled Gemini session failed (%s), reconnecting.", error)
+                await self._stack.aclose()
+                self._stack = contextlib.AsyncExitStack()
+                self._session = await self._stack.enter_async_context(
+                    client.aio.live.connect(model=MODEL, config=CONFIG)
+                )
+            return self._session
+
+    async def send(self, *args, **kwargs):
+        session = self._session
+        try:
+            await session.send(*args, **kwargs)
+        except Exception as e:
+            if self._verified:
+                raise
+            session = await self._replace(session, e)
+            await session.send(*args, **kwargs)
+
+    async def receive(self):
+        session = self._session
+        turn = session.receive().__aiter__()
+        try:
+            response = await turn.__anext__()
+        except StopAsyncIteration:
+            return
+        except Exception as e:
+            if self._verified:
+                raise
+            session = await self._replace(session, e)
+            turn = session.receive().__aiter__()
+            try:
+                response = await turn.__anext__()
+            except StopAsyncIteration:
+                return
+        self._verified = True
+        yield response
+        async for response in turn:
+            yield response
+
+    async def aclose(self):
+        await self._stack.aclose()
+
+@contextlib.asynccontextmanager
+async def gemini_session():
+    """Yields a pre-warmed session if a live one is ready, else connects inline."""
+    while True:
+        pooled = _take_pooled_session()
+        if pooled is None:
+            async with client.aio.live.connect(model=MODEL, config=CONFIG) as session:
+                yield session
+            return
+        if _session_is_open(pooled.session):
+            break
+        # Closed while idle; its keeper has already started a replacement
+        await pooled.stack.aclose()
+
+    session = _FallbackSession(pooled)
+    try:
+        yield session
+    finally:
+        await session.aclose()
+
+@app.on_event("startup")
+async def start_session_pool():
+    app.state.session_pool = collections.deque()
+    app.state.session_keepers = [
+        asyncio.create_task(_keep_session_warm()) for _ in range(SESSION_POOL_SIZE)
+    ]
+
+@app.on_event("shutdown")
+async def stop_session_pool():
+    for task in app.state.session_keepers:
+        task.cancel()
+    await asyncio.gather(*app.state.session_keepers, return_exceptions=True)
+
+class _SessionEnded(Exception):
+    """Raised by a WebSocket loop that finished, to stop its TaskGroup."""
+
+async def _end_session_after(coro):
+    await coro
+    raise _SessionEnded
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    print("[Server] WebSocket connected from client.")
+    logger.info("[Server] WebSocket connected from client.")
     current_response = None
 
     await websocket.send_text("ACK:SERVER_READY")
 
-    async with client.aio.live.connect(model=MODEL, config=CONFIG) as session:
-        print("[Server] Gemini session started.")
+    async with gemini_session() as session:
+        logger.info("[Server] Gemini session started.")
 
         async def from_client():
+            # Bound once; these run for every audio frame
+            recv = websocket.receive
+            send = session.send
             try:
                 while True:
-                    pkt = await websocket.receive()
-                    if "text" in pkt:
-                        text_msg = pkt["text"]
-                        if text_msg.startswith("TEXT:"):
-                            user_text = text_msg[5:].strip()
-                            print(f"[Server] Received TEXT: {user_text}")
-                            # Don't try to close previous turn, just send new message
-                            await session.send(user_text, end_of_turn=True)
-                        elif text_msg.startswith("ACK:"):
-                            print(f"[Server] Received ACK from client: {text_msg}")
-                        else:
-                            print(f"[Server] Unknown text message: {text_msg}")
-                    elif "bytes" in pkt:
-                        audio_bytes = pkt["bytes"]
-                        if len(audio_bytes) == 0:
+                    pkt = await recv()
+                    if pkt["type"] == "websocket.disconnect":
+                        # Raw receive() reports a disconnect instead of raising
+                        logger.info("[Server] Client disconnected.")
+                        return
+                    audio_bytes = pkt.get("bytes")
+                    if audio_bytes is not None:
+                        if not audio_bytes:
                             continue
-                        print(f"[Server] Received {len(audio_bytes)} bytes of PCM")
-                        await session.send({
+                        logger.debug("[Server] Received %d bytes of PCM", len(audio_bytes))
+                        await send({
                             "mime_type": "audio/pcm",
                             "data": audio_bytes
                         }, end_of_turn=True)
+                        continue
+                    text_msg = pkt.get("text")
+                    if text_msg is not None:
+                        # Text frames are "<KIND>:<payload>"; split once and
+                        # dispatch on the kind instead of repeated prefix scans.
+                        # (Binary frames stay reserved for untagged PCM.)
+                        kind, _, payload = text_msg.partition(":")
+                        if kind == "TEXT":
+                            user_text = payload.strip()
+                            logger.info("[Server] Received TEXT: %s", user_text)
+                            # Don't try to close previous turn, just send new message
+                            await send(user_text, end_of_turn=True)
+                        elif kind == "ACK":
+                            logger.info("[Server] Received ACK from client: %s", text_msg)
+                        else:
+                            logger.warning("[Server] Unknown text message: %s", text_msg)
             except WebSocketDisconnect:
-                print("[Server] Client disconnected.")
+                logger.info("[Server] Client disconnected.")
             except Exception as e:
-                print(f"[Server] Error in from_client: {e}")
+                logger.error("[Server] Error in from_client: %s", e)
                 raise  # Re-raise to see full traceback
 
+        # Decouples reading Gemini from writing the browser socket. Items are
+        # raw PCM bytes or "TEXT:..." strings, kept in arrival order. Only
+        # audio counts towards OUT_QUEUE_MAX_BYTES and only audio is ever dropped.
+        out_queue = collections.deque()
+        out_ready = asyncio.Event()
+        audio_queued = 0  # bytes
+
+        def enqueue(item):
+            nonlocal audio_queued
+            if not isinstance(item, str):
+                audio_queued += len(item)
+                # Only trips when the socket has fallen OUT_QUEUE_MAX_BYTES behind,
+                # i.e. the browser is stalling, not on faster-than-real-time bursts
+                # a healthy socket drains. Drop the oldest audio (never text)
+                # rather than stall Gemini.
+                while audio_queued > OUT_QUEUE_MAX_BYTES:
+                    for i, queued in enumerate(out_queue):
+                        if not isinstance(queued, str):
+                            del out_queue[i]
+                            audio_queued -= len(queued)
+                            logger.debug("[Server] Outbound queue full, dropped oldest audio frame")
+                            break
+                    else:
+                        break
+            out_queue.append(item)
+            out_ready.set()
+
+        def pop_frame():
+            nonlocal audio_queued
+            item = out_queue.popleft()
+            if not isinstance(item, str):
+                audio_queued -= len(item)
+            return item
+
+        async def next_frame():
+            while not out_queue:
+                out_ready.clear()
+                await out_ready.wait()
+            return pop_frame()
+
         async def from_gemini():
+            receive = session.receive
             try:
                 while True:
-                    async for response in session.receive():
-                        if response.data:
-                            raw_audio = response.data
-                            print(f"[Server] Sending {len(raw_audio)} bytes of PCM")
-                            await websocket.send_bytes(b"AUDIO:" + raw_audio)
-                        if response.text:
-                            print(f"[Server] Sending TEXT: {response.text}")
-                            await websocket.send_text("TEXT:" + response.text)
+                    async for response in receive():
+                        raw_audio = response.data
+                        if raw_audio:
+                            logger.debug("[Server] Sending %d bytes of PCM", len(raw_audio))
+                            enqueue(raw_audio)
+                        text = response.text
+                        if text:
+                            logger.info("[Server] Sending TEXT: %s", text)
+                            enqueue("TEXT:" + text)
+            except ConnectionClosedOK:
+                # Gemini ended the session (e.g. it expired); close the browser side cleanly
+                logger.info("[Server] Gemini closed the session.")
             except Exception as e:
-                print(f"[Server] Error in from_gemini: {e}")
+                logger.error("[Server] Error in from_gemini: %s", e)
                 raise  # Re-raise to see full traceback
 
-        client_task = asyncio.create_task(from_client())
-        gemini_task = asyncio.create_task(from_gemini())
+        async def drain_ws():
+            loop = asyncio.get_running_loop()
+            buf = bytearray(COALESCE_BUFFER_SIZE)
+            view = memoryview(buf)
+            off = 0
+
+            async def flush():
+                nonlocal off
+                if off:
+                    # Binary frames are always audio; no tag needed
+                    await websocket.send_bytes(bytes(view[:off]))
+                    off = 0
+
+            # One timer per batch (rather than a wait_for Task per chunk)
+            flush_due = False
+
+            def on_flush_timer():
+                nonlocal flush_due
+                flush_due = True
+                out_ready.set()
+
+            try:
+                while True:
+                    item = await next_frame()
+                    if isinstance(item, str):
+                        await websocket.send_text(item)
+                        continue
+                    flush_due = False
+                    timer = loop.call_later(COALESCE_FLUSH_DELAY, on_flush_timer)
+                    try:
+                        while True:
+                            n = len(item)
+                            if off + n > COALESCE_BUFFER_SIZE:
+                                await flush()
+                            if n > COALESCE_BUFFER_SIZE:
+                                await websocket.send_bytes(item)
+                            else:
+                                view[off:off + n] = item
+                                off += n
+                            if off >= COALESCE_FLUSH_BYTES or flush_due:
+                                item = None
+                                break
+                            # Copy whatever is already queued without yielding;
+                            # only wait when the queue is empty.
+                            while not out_queue and not flush_due:
+                                out_ready.clear()
+                                await out_ready.wait()
+                            if not out_queue:
+                                item = None
+                                break
+                            item = pop_frame()
+                            if isinstance(item, str):
+                                break
+                    finally:
+                        timer.cancel()
+                    # Audio queued before a text frame goes out first
+                    await flush()
+                    if item is not None:
+                        await websocket.send_text(item)
+            except WebSocketDisconnect:
+                logger.info("[Server] Client disconnected.")
+            except Exception as e:
+                logger.error("[Server] Error in drain_ws: %s", e)
+                raise  # Re-raise to see full traceback
 
-        done, pending = await asyncio.wait(
-            [client_task, gemini_task],
-            return_when=asyncio.FIRST_COMPLETED
-        )
-        for t in pending:
-            t.cancel()
+        # The session ends as soon as any of the three loops finishes; the
+        # TaskGroup then cancels the others and waits for them to exit.
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(_end_session_after(from_client()))
+                tg.create_task(_end_session_after(from_gemini()))
+                tg.create_task(_end_session_after(drain_ws()))
+        except ExceptionGroup as eg:
+            _, rest = eg.split((_SessionEnded, WebSocketDisconnect))
+            if rest is not None:
+                raise rest
 
-    print("[Server] Gemini session closed. WebSocket endpoint done.")
-    await websocket.close()
+    logger.info("[Server] Gemini session closed. WebSocket endpoint done.")
+    # Closing again after the browser has gone is an ASGI protocol error
+    if websocket.client_state != WebSocketState.DISCONNECTED:
+        await websocket.close()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        # "auto" picks uvloop/httptools when installed (not on Windows)
+        loop="auto",
+        http="auto",
+        ws="websockets",
+        # PCM doesn't compress; skip zlib on every audio frame
+        ws_per_message_deflate=False,
+        log_level="warning",
+    )
@@ -19,9 +19,13 @@
 To install the dependencies for this script, run:
 
 ``` 
-pip install google-genai opencv-python pyaudio pillow mss
+pip install google-genai opencv-python pyaudio pillow mss aioconsole
 ```
 
+Optionally, `pip install uvloop` (not available on Windows) for a faster
+event loop, and `pip install PyTurboJPEG` (plus the libjpeg-turbo library)
+for faster camera frame encoding.
+
 Before running this script, ensure the `GOOGLE_API_KEY` environment
 variable is set to the api-key you obtained from Google AI Studio.
 
@@ -46,14 +50,16 @@ python live_api_starter.py --mode screen
 """
 
 import asyncio
-import base64
 import io
 import os
 import sys
 import traceback
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import aioconsole
 import cv2
+import numpy as np
 import pyaudio
 import PIL.Image
 import mss
@@ -62,6 +68,20 @@ import argparse
 
 from google import genai
 
+# uvloop (libuv-based event loop) is not available on Windows
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Optional SIMD JPEG encoder (libjpeg-turbo); falls back to cv2.imencode
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+
 # Backports for Python < 3.11
 if sys.version_info < (3, 11, 0):
     import taskgroup, exceptiongroup
@@ -75,6 +95,20 @@ CHANNELS = 1
 SEND_SAMPLE_RATE = 16000        # fps : frames per second 
 RECEIVE_SAMPLE_RATE = 24000     # fps : frames per second
 CHUNK_SIZE = 1024
+MIC_QUEUE_SIZE = 8              # captured chunks held before the oldest is dropped (~0.5 s)
+AUDIO_RING_SIZE = 1 << 20       # bytes of model audio buffered for playback (~21 s)
+PLAYBACK_CHUNK_SIZE = 8192      # max bytes per stream.write (~170 ms), bounds audio played after a reset
+
+# Concurrent session.send calls in send_realtime
+MAX_INFLIGHT_SENDS = 2
+
+# Worker threads for asyncio.to_thread (mic, speaker, camera/screen capture);
+# at least 8, and never below Python's own default of cpu_count + 4
+EXECUTOR_WORKERS = max(8, (os.cpu_count() or 1) + 4)
+
+# Image constants
+JPEG_QUALITY = 75
+JPEG_ENCODE_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
 
 # Model and mode settings
 MODEL = "models/gemini-2.0-flash-exp"
@@ -96,6 +130,27 @@ else:
 pya = pyaudio.PyAudio()
 
 
+def jpeg_part(image_bytes):
+    """
+    Wraps JPEG bytes as an image part for session.send. The data stays raw
+    bytes, like mic audio: the SDK base64-encodes bytes itself for the wire,
+    so encoding here would just add a str round-trip.
+    """
+    return {"mime_type": "image/jpeg", "data": image_bytes}
+
+
+def restore_blocking_stdio():
+    """
+    aioconsole puts the tty behind stdin/stdout/stderr into non-blocking mode;
+    switch it back so plain print() can't fail with BlockingIOError.
+    """
+    for stream in (sys.stdin, sys.stdout, sys.stderr):
+        try:
+            os.set_blocking(stream.fileno(), True)
+        except (AttributeError, OSError, ValueError):
+            pass
+
+
 def print_greeting_and_instructions():
     """
     Prints a warm greeting (ASCII art) and concise instructions on how to use this application.
@@ -135,13 +190,61 @@ def print_greeting_and_instructions():
     print("\nSession starting... Have fun!\n")
 
 
+class AudioRingBuffer:
+    """
+    Fixed-size byte ring holding model PCM between receive_audio (producer) and
+    play_audio (consumer). Both sides run on the event loop, so head/tail need no
+    locking: tail - head is the number of unplayed bytes. If the producer gets a
+    full ring ahead, the oldest audio is overwritten.
+    """
+
+    def __init__(self, size=AUDIO_RING_SIZE):
+        self.size = size
+        self.ring = bytearray(size)
+        self.view = memoryview(self.ring)
+        self.head = 0  # total bytes consumed
+        self.tail = 0  # total bytes produced
+        self.notify = asyncio.Event()
+
+    def write(self, data):
+        """Copies data into the ring (wrapping at the end) and wakes the consumer."""
+        data = memoryview(data)[-self.size:]
+        n = len(data)
+        start = self.tail % self.size
+        first = min(n, self.size - start)
+        self.view[start:start + first] = data[:first]
+        self.view[:n - first] = data[first:]
+        self.tail += n
+        if self.tail - self.head > self.size:
+            self.head = self.tail - self.size
+        self.notify.set()
+
+    async def read(self, max_bytes=PLAYBACK_CHUNK_SIZE):
+        """Waits for audio, then returns up to max_bytes of unplayed bytes (never across the wrap)."""
+        while self.head == self.tail:
+            self.notify.clear()
+            await self.notify.wait()
+        start = self.head % self.size
+        n = min(self.tail - self.head, self.size - start, max_bytes)
+        self.head += n
+        return bytes(self.view[start:start + n])
+
+    def reset(self):
+        """Discards all unplayed audio in O(1)."""
+        self.head = self.tail
+
+
 class AudioLoop:
     def __init__(self, video_mode=DEFAULT_MODE):
         self.video_mode = video_mode
         
-        self.audio_in_queue = None
+        self.audio_in_ring = None
         self.out_queue = None
         self.session = None
+        self.sct = None
+        self.cap = None
+        self.frame_size = None
+        self.frame_buf = None
 
         # Track stats
         self.user_message_count = 0  # number of messages user typed
@@ -154,7 +257,7 @@ class AudioLoop:
         """
         while True:
             # Show prompt on a fresh line to avoid interruption:
-            text = await asyncio.to_thread(input, "\nmessage > ")
+            text = await aioconsole.ainput("\nmessage > ")
             if text.lower() == "q":
                 break
 
@@ -164,71 +267,146 @@ class AudioLoop:
 
             await self.session.send(text or ".", end_of_turn=True)
 
-    def _get_frame(self, cap):
+    def _get_frame(self):
         """Captures a single frame from camera, resizes, encodes, returns dict."""
-        ret, frame = cap.read()
+        ret, frame = self.cap.read()
         if not ret:
             return None
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
-        img.thumbnail([1024, 1024])
 
-        image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
+        # Work out the target size once (fit within 1024x1024, never upscale)
+        # and reuse the same output array for every resize.
+        if self.frame_size is None:
+            h, w = frame.shape[:2]
+            scale = min(1.0, 1024 / max(w, h))
+            self.frame_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            if scale < 1.0:
+                self.frame_buf = np.empty(
+                    (self.frame_size[1], self.frame_size[0], frame.shape[2]), dtype=frame.dtype
+                )
+        if self.frame_buf is not None:
+            frame = cv2.resize(frame, self.frame_size, dst=self.frame_buf, interpolation=cv2.INTER_AREA)
+
+        # Both encoders take the BGR array directly, no PIL/BytesIO detour
+        if turbo_jpeg is not None:
+            return jpeg_part(turbo_jpeg.encode(frame, quality=JPEG_QUALITY, jpeg_subsample=TJSAMP_420))
+
+        ok, jpg = cv2.imencode(".jpg", frame, JPEG_ENCODE_PARAMS)
+        if not ok:
+            return None
 
-        mime_type = "image/jpeg"
-        image_bytes = image_io.read()
-        return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+        return jpeg_part(jpg.tobytes())
 
     async def get_frames(self):
         """Continuously captures frames from the default camera."""
-        cap = await asyncio.to_thread(cv2.VideoCapture, 0)
-        while True:
-            frame = await asyncio.to_thread(self._get_frame, cap)
-            if frame is None:
-                break
-            await asyncio.sleep(1.0)
-            await self.out_queue.put(frame)
-        cap.release()
+        self.cap = await asyncio.to_thread(cv2.VideoCapture, 0)
+        try:
+            while True:
+                frame = await asyncio.to_thread(self._get_frame)
+                if frame is None:
+                    break
+                await asyncio.sleep(1.0)
+                await self.out_queue.put(frame)
+        finally:
+            self.cap.release()
 
     def _get_screen(self):
         """Captures the entire screen as a screenshot, returns dict."""
-        sct = mss.mss()
-        monitor = sct.monitors[0]
-        i = sct.grab(monitor)
+        # Reuse one mss handle; creating it per frame allocates X11/Win32 resources
+        if self.sct is None:
+            self.sct = mss.mss()
+        monitor = self.sct.monitors[0]
+        shot = self.sct.grab(monitor)
 
-        mime_type = "image/jpeg"
-        image_bytes = mss.tools.to_png(i.rgb, i.size)
-        img = PIL.Image.open(io.BytesIO(image_bytes))
+        # Build the image straight from the raw pixels (no PNG round-trip)
+        img = PIL.Image.frombytes("RGB", shot.size, shot.rgb)
+        img.thumbnail([1024, 1024], PIL.Image.BILINEAR)
 
         image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
+        img.save(image_io, format="jpeg", quality=JPEG_QUALITY, optimize=False)
 
-        image_bytes = image_io.read()
-        return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+        return jpeg_part(image_io.getvalue())
 
     async def get_screen(self):
         """Continuously captures screenshots every ~1 second."""
-        while True:
-            frame = await asyncio.to_thread(self._get_screen)
-            if frame is None:
-                break
-            await asyncio.sleep(1.0)
-            await self.out_queue.put(frame)
+        # mss handles are thread-local, so every grab (and the final close)
+        # must run on the one thread that created self.sct.
+        loop = asyncio.get_running_loop()
+        screen_executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            while True:
+                frame = await loop.run_in_executor(screen_executor, self._get_screen)
+                if frame is None:
+                    break
+                await asyncio.sleep(1.0)
+                await self.out_queue.put(frame)
+        finally:
+            if self.sct is not None:
+                await loop.run_in_executor(screen_executor, self.sct.close)
+                self.sct = None
+            screen_executor.shutdown(wait=False)
 
     async def send_realtime(self):
-        """Sends frames or mic-audio data from out_queue to the AI session."""
-        while True:
-            msg = await self.out_queue.get()
-            await self.session.send(msg)
+        """
+        Sends frames or mic-audio data from out_queue to the AI session.
+        Up to MAX_INFLIGHT_SENDS sends run at once, so taking the next message
+        off the queue overlaps with the send still in flight.
+        """
+        inflight = set()
+        current = asyncio.current_task()
+        failure = None
+
+        def on_send_done(task):
+            # A failed send interrupts the loop right away, even while it is
+            # idle waiting on out_queue.
+            nonlocal failure
+            inflight.discard(task)
+            if task.cancelled() or task.exception() is None:
+                return
+            if failure is None:
+                failure = task.exception()
+                current.cancel()
+
+        try:
+            while True:
+                msg = await self.out_queue.get()
+                task = asyncio.create_task(self.session.send(msg))
+                inflight.add(task)
+                task.add_done_callback(on_send_done)
+                if len(inflight) >= MAX_INFLIGHT_SENDS:
+                    await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            if failure is None:
+                raise
+            if hasattr(current, "uncancel"):  # Python 3.11+
+                current.uncancel()
+            raise failure from None
+        finally:
+            for task in inflight:
+                task.cancel()
+            await asyncio.gather(*inflight, return_exceptions=True)
 
     async def listen_audio(self):
         """Captures mic audio in real-time, sends it to the AI session."""
         mic_available, mic_info = check_audio_input()
         if not mic_available:
             pass
+
+        # PortAudio drives capture from its own thread and hands each chunk
+        # to the event loop, instead of a to_thread hop per read().
+        loop = asyncio.get_running_loop()
+        mic_queue = asyncio.Queue(maxsize=MIC_QUEUE_SIZE)
+
+        def push_mic_chunk(data):
+            # Runs on the event loop. If sending falls behind, drop the oldest
+            # chunk so mic latency stays bounded (like PortAudio overflow did).
+            if mic_queue.full():
+                mic_queue.get_nowait()
+            mic_queue.put_nowait(data)
+
+        def on_audio(in_data, frame_count, time_info, status):
+            loop.call_soon_threadsafe(push_mic_chunk, in_data)
+            return (None, pyaudio.paContinue)
+
         self.audio_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
@@ -237,19 +415,17 @@ class AudioLoop:
             input=True,
             input_device_index=mic_info["index"],
             frames_per_buffer=CHUNK_SIZE,
+            stream_callback=on_audio,
+            start=True,
         )
-        if __debug__:
-            kwargs = {"exception_on_overflow": False}
-        else:
-            kwargs = {}
 
         while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
+            data = await mic_queue.get()
             await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})      # sends data in uncompressed binary format. pcm : pulse control modulation. 
 
     async def receive_audio(self):
         """
-        Receives audio bytes from the AI and puts them into audio_in_queue for playback.
+        Receives audio bytes from the AI and writes them into audio_in_ring for playback.
         Also prints the model's text, but in this application, the model output is Audio Only.
         We insert a line-break before printing to avoid overwriting the user's prompt.
         """
@@ -258,17 +434,16 @@ class AudioLoop:
             async for response in turn:
                 # If there's audio data, queue it for playback
                 if data := response.data:
-                    self.audio_in_queue.put_nowait(data)
+                    self.audio_in_ring.write(data)
                     continue
 
                 # If there's text, print it on a new line (not typical in this example,
                 # but left here if the model occasionally produces text).
                 if text := response.text:
-                    print("\n[Model Text]:", text)
+                    await aioconsole.aprint("\n[Model Text]:", text)
 
             # If the model's turn completes, clear any unplayed audio data.
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
+            self.audio_in_ring.reset()
 
     async def play_audio(self):
         """
@@ -283,7 +458,7 @@ class AudioLoop:
             output=True,
         )
         while True:
-            bytestream = await self.audio_in_queue.get()
+            bytestream = await self.audio_in_ring.read()
             # Let the user know we’re receiving/playing model audio
             await asyncio.to_thread(stream.write, bytestream)
 
@@ -304,6 +479,11 @@ class AudioLoop:
         try:
             self.start_time = time.time()  # Start timing the session
 
+            # Room for the remaining blocking calls (audio/camera/screen I/O)
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+            )
+
             async with (
                 client.aio.live.connect(model=MODEL, config=CONFIG) as session,
                 asyncio.TaskGroup() as tg,
@@ -311,7 +491,7 @@ class AudioLoop:
                 self.session = session
 
                 # Queues for inbound/outbound data
-                self.audio_in_queue = asyncio.Queue()
+                self.audio_in_ring = AudioRingBuffer()
                 self.out_queue = asyncio.Queue(maxsize=5)
 
                 # Start tasks
@@ -338,9 +518,11 @@ class AudioLoop:
         except ExceptionGroup as EG:
             # In case of grouped exceptions
             self.audio_stream.close()
+            restore_blocking_stdio()
             traceback.print_exception(EG)
         finally:
             # Print session summary
+            restore_blocking_stdio()
             self.print_session_summary()
             # Clean up audio devices if not already closed
             if hasattr(self, "audio_stream"):
@@ -375,4 +557,7 @@ if __name__ == "__main__":
     print_greeting_and_instructions()
 
     main = AudioLoop(video_mode=args.mode)
-    asyncio.run(main.run())
+    if uvloop is not None:
+        uvloop.run(main.run())
+    else:
+        asyncio.run(main.run())
@@ -76,17 +76,17 @@ function handleTextMessage(text) {
   }
 }
 
+// Every binary frame from the server is raw 16-bit PCM
 function handleAudioMessage(data) {
-  const dataArr = new Uint8Array(data);
-  if (new TextDecoder().decode(dataArr.slice(0,6)) === "AUDIO:") {
-    const audioData = dataArr.slice(6);
-    if (playbackNode) {
-      playbackNode.port.postMessage({
-        type: "AUDIO_DATA",
-        data: audioData
-      });
-      logMessage("Sent audio chunk to playback processor:", audioData.byteLength, "bytes");
-    }
+  const audioData = new Uint8Array(data);
+  const byteLength = audioData.byteLength;
+  if (playbackNode) {
+    // Transfer the buffer instead of structured-cloning it
+    playbackNode.port.postMessage({
+      type: "AUDIO_DATA",
+      data: audioData
+    }, [audioData.buffer]);
+    logMessage("Sent audio chunk to playback processor:", byteLength, "bytes");
   }
 }
 